@@ -150,7 +150,7 @@ def get_alerts_between_dates_by_type(
 
     alert_type_query = alert_type_query.format(
         " AND " if company_ids else "",
-        "( " + " OR ".join(["company.name=%s" for company in selected_companies]) + ") " if company_ids else "",
+        f"company_id IN ({', '.join(['%s'] * len(company_ids))}) " if company_ids else "",
     )
 
     alert_types = unique_alert_types_between_dates(start_date, end_date, con)
@@ -158,6 +158,7 @@ def get_alerts_between_dates_by_type(
     alert_type_dfs = {}
     for alert_type in alert_types:
         params = [alert_type, start_date.strftime("%Y-%m-%d %H:%M:%S"), end_date.strftime("%Y-%m-%d %H:%M:%S")]
+        params.extend(company_ids)
         alert_type_df = pd.read_sql_query(alert_type_query, con, params=params)
 
         alert_type_df.set_index("month", inplace=True)
@@ -118,7 +118,7 @@ def get_alerts_between_dates(
 
     alert_query = alert_query.format(
         " AND " if company_ids else "",
-        "( " + " OR ".join(["company_id=%s" for company in selected_companies]) + ") " if company_ids else "",
+        f"company_id IN ({', '.join(['%s'] * len(company_ids))}) " if company_ids else "",
     )
 
     params = [start_date.strftime("%Y-%m-%d %H:%M:%S"), end_date.strftime("%Y-%m-%d %H:%M:%S")]
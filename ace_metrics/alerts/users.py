@@ -34,10 +34,10 @@ def get_all_users(con: pymysql.connections.Connection) -> UserMap:
     """
     cursor = con.cursor()
     cursor.execute("SELECT id,username,display_name,queue,enabled FROM users")
-    users = {}
-    for user_id, username, display_name, queue, enabled in cursor.fetchall():
-        users[user_id] = {"username": username, "display_name": display_name, "queue": queue, "enabled": enabled}
-    return users
+    return {
+        user_id: {"username": username, "display_name": display_name, "queue": queue, "enabled": enabled}
+        for user_id, username, display_name, queue, enabled in cursor.fetchall()
+    }
 
 
 def generate_user_alert_stats(alerts: pd.DataFrame, users: UserMap, business_hours=False) -> UserStatMap:
@@ -57,11 +57,15 @@ def generate_user_alert_stats(alerts: pd.DataFrame, users: UserMap, business_hou
         statatistic maps for users.
     """
 
+    # split the alerts by user once instead of filtering them for every user
+    alerts_by_user = dict(tuple(alerts.groupby("disposition_user_id", sort=False)))
+    no_alerts = alerts.iloc[0:0]
+
     all_user_alert_stats = {}
     for user_id in users.keys():
         username = users[user_id]["username"]
         display_name = users[user_id].get("display_name", None)
-        user_alerts = alerts[alerts.disposition_user_id == user_id]
+        user_alerts = alerts_by_user.get(user_id, no_alerts)
         user_alert_stats = statistics_by_month_by_dispo(user_alerts, business_hours=business_hours)
         for stat in VALID_ALERT_STATS:
             if display_name:
@@ -80,26 +84,32 @@ def alert_quantities_by_user_by_month(
     query: str = ALERTS_BY_MONTH_AND_USER_QUERY,
     exclude_analysts_without_data=True,
 ) -> pd.DataFrame:
-    """Get Alert quantities by user and month."""
+    """Get Alert quantities by user and month.
+
+    All of the counts are queried at once and pivoted into a
+    month x username table.
+    """
 
     months = get_month_keys_between_two_dates(start_date, end_date)
+    if not months:
+        # no months between the dates, so nothing to count
+        user_dispositions_per_month = pd.DataFrame(index=pd.Index([], name="month"))
+        user_dispositions_per_month.name = "Alert Quantities by Analyst"
+        return user_dispositions_per_month
+
     users = get_all_users(con)
 
-    cursor = con.cursor()
+    counts = pd.read_sql_query(query, con, params=[months[0], months[-1]])
+    user_dispositions_per_month = counts.pivot(index="month", columns="user", values="alerts")
+
+    # keep the user table ordering
+    usernames = [udata["username"] for udata in users.values()]
+    if exclude_analysts_without_data:
+        # don't record users that have no data
+        usernames = [username for username in usernames if username in user_dispositions_per_month.columns]
+    user_dispositions_per_month = user_dispositions_per_month.reindex(columns=usernames)
 
-    data = {}
-    for uid, udata in users.items():
-        month_data = {}
-        for month in months:
-            cursor.execute(query, (month, udata["username"]))
-            stats = cursor.fetchone()
-            if stats:
-                month_data[month] = stats[0]
-        if month_data and exclude_analysts_without_data:
-            # don't record users that have no data
-            data[udata["username"]] = month_data
-
-    user_dispositions_per_month = pd.DataFrame(data=data)
+    user_dispositions_per_month.columns.name = None
     user_dispositions_per_month.name = "Alert Quantities by Analyst"
     user_dispositions_per_month.fillna(value=0, inplace=True)
     user_dispositions_per_month.index.name = "month"
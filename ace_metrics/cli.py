@@ -13,6 +13,7 @@ import pandas as pd
 from tabulate import tabulate
 
 from .alerts import VALID_ALERT_STATS, FRIENDLY_STAT_NAME_MAP, ALERTS_BY_MONTH_DB_QUERY, statistics_by_month_by_dispo
+from .helpers import ARCHIVE_COMPRESSIONS, ARCHIVE_TABLE_FORMATS
 
 
 STDOUT_FORMATS = ["json", "csv", "ascii_table", "print"]
@@ -211,6 +212,20 @@ def build_metric_parser(parser: argparse.ArgumentParser) -> None:
         choices=FILEOUT_FORMATS,
         help="desired file output format. Default is xls.",
     )
+    parser.add_argument(
+        "--archive-compression",
+        default="gz",
+        action="store",
+        choices=list(ARCHIVE_COMPRESSIONS),
+        help="compression of the json file output archive. Default is gz. zst requires the zstandard package.",
+    )
+    parser.add_argument(
+        "--archive-table-format",
+        default="json",
+        action="store",
+        choices=ARCHIVE_TABLE_FORMATS,
+        help="file format of the tables in the json file output archive. Default is json. parquet and feather require the pyarrow package.",
+    )
     parser.add_argument(
         "-f", "--filename", action="store", default=None, help="The name of a file to write results to."
     )
@@ -515,22 +530,24 @@ def execute_metric_arguments(db: pymysql.connections.Connection, args):
         time_stamp = time_stamp[: time_stamp.rfind(".")]
         filename = f"ACE_metrics_{time_stamp}"
 
-        if args.fileout_format == "xls":
+        if args.fileout_format == "xlsx":
             if args.filename:
                 filename = args.filename
             else:
                 filename += ".xlsx"
             with open(filename, "wb") as fp:
-                fp.write(dataframes_to_xlsx_bytes(tables))
+                dataframes_to_xlsx_bytes(tables, fileobj=fp)
             if os.path.exists(filename):
                 print(f" + wrote {filename}")
         if args.fileout_format == "json":
             if args.filename:
                 filename = args.filename
             else:
-                filename += ".tar.gz"
+                filename += ARCHIVE_COMPRESSIONS[args.archive_compression]
             with open(filename, "wb") as fp:
-                fp.write(dataframes_to_archive_bytes_of_json_files(tables))
+                dataframes_to_archive_bytes_of_json_files(
+                    tables, fileobj=fp, compression=args.archive_compression, table_format=args.archive_table_format
+                )
             if os.path.exists(filename):
                 print(f" + wrote {filename}")
     else:
@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+import functools
 
 from configparser import ConfigParser
 
@@ -19,9 +20,24 @@ if ENV_CONFIG_PATH is not None:
     DEFAULT_CONFIG_PATHS.append(ENV_CONFIG_PATH)
 
 
+@functools.lru_cache(maxsize=8)
+def _load_config_cached(paths_with_mtimes: tuple) -> ConfigParser:
+    """Parse the given config files.
+
+    Cached on the paths and their modification times so the files are
+    only parsed again after one of them changes.
+    """
+    config = ConfigParser()
+    config.read([cp for cp, _ in paths_with_mtimes])
+    return config
+
+
 def load_config(config_paths: list = DEFAULT_CONFIG_PATHS) -> ConfigParser:
     """Load ACE Metric configuration.
 
+    The returned ConfigParser is shared between callers loading the same,
+    unchanged, config files and should not be modified.
+
     Args:
       config_paths: List of configuration paths.
 
@@ -29,7 +45,6 @@ def load_config(config_paths: list = DEFAULT_CONFIG_PATHS) -> ConfigParser:
       A ConfigParser
     """
 
-    config = ConfigParser()
     finds = []
     for cp in config_paths:
         if cp and os.path.exists(cp):
@@ -39,6 +54,4 @@ def load_config(config_paths: list = DEFAULT_CONFIG_PATHS) -> ConfigParser:
         logging.error("Didn't find any config files defined at these paths: {}".format(config_paths))
         return False
 
-    config.read(finds)
-
-    return config
+    return _load_config_cached(tuple((cp, os.path.getmtime(cp)) for cp in finds))
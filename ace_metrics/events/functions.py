@@ -158,7 +158,7 @@ def get_events_between_dates(
 
     event_query = event_query.format(
         " AND " if company_ids else "",
-        "( " + " OR ".join(["company.id=%s" for company in selected_companies]) + ") " if company_ids else "",
+        f"company.id IN ({', '.join(['%s'] * len(company_ids))}) " if company_ids else "",
     )
 
     params = [start_date.strftime("%Y-%m-%d %H:%M:%S"), end_date.strftime("%Y-%m-%d %H:%M:%S")]
@@ -2,16 +2,24 @@
 
 import io
 import os
+import re
+import math
+import gzip
+import itertools
+import numbers
 import logging
 import pymysql
 import tarfile
+import weakref
+import threading
+import xlsxwriter
 import configparser
 
+import numpy as np
 import pandas as pd
 from datetime import timedelta, datetime, time
-from dateutil.relativedelta import relativedelta
 
-from typing import Mapping, List, Tuple
+from typing import Any, BinaryIO, Mapping, List, Optional, Tuple, Union
 
 from .alerts import FRIENDLY_STAT_NAME_MAP
 
@@ -19,6 +27,29 @@ CompanyID = int
 CompanyName = str
 CompanyMap = Mapping[CompanyID, CompanyName]
 
+# Friendly statistic names, longest first, mapped back to their key names
+_FRIENDLY_STAT_NAME_RE = re.compile(
+    "|".join(re.escape(name) for name in sorted(FRIENDLY_STAT_NAME_MAP.values(), key=len, reverse=True))
+)
+_FRIENDLY_STAT_NAME_KEYS = {name: key for key, name in FRIENDLY_STAT_NAME_MAP.items()}
+
+# Characters that are invalid in file and tab names, replaced with "-"
+_INVALID_TABLE_NAME_CHARS = str.maketrans({char: "-" for char in "\\*?:/[]"})
+
+# Numbers for unique fallback and collision table names
+_unique_name_ids = itertools.count(1)
+
+# Companies already queried on a connection, see get_companies
+_companies_by_connection = weakref.WeakKeyDictionary()
+
+# Open ACE DB connections of each thread, see connect_to_database
+_thread_connections = threading.local()
+
+# Archive compressions and their file extensions
+ARCHIVE_COMPRESSIONS = {"gz": ".tar.gz", "zst": ".tar.zst"}
+# Formats the tables of an archive can be written in
+ARCHIVE_TABLE_FORMATS = ["json", "parquet", "feather"]
+
 
 def generate_html_plot(
     data_table: pd.DataFrame,
@@ -29,7 +60,10 @@ def generate_html_plot(
     figsize=(1000, 600),
     title=None,
     ylabel=None,
-) -> str:
+    webgl=True,
+    max_points=2000,
+    compress=False,
+) -> Union[str, bytes]:
     """Convert a datatable into an HTML Bokeh plot.
 
     This is very customized with defaults.
@@ -39,12 +73,20 @@ def generate_html_plot(
 
     Args:
         data_table: A pandas DataFrame
+        webgl: Render the plot with WebGL instead of a 2D canvas,
+          which is much faster for long time series.
+        max_points: Downsample tables with more rows than this before
+          plotting, so the plot keeps about this many points per series.
+          None plots every row.
+        compress: Return the HTML gzip compressed, ready to be stored or
+          served with a "Content-Encoding: gzip" header.
 
     Returns:
         An HTML element representing the plot,
-        as a string.
+        as a string, or as gzip compressed bytes of its
+        UTF-8 encoding if compress is True.
     """
-    import math
+    # pandas_bokeh pulls in all of bokeh, only import it when plotting
     import pandas_bokeh
 
     if ylabel is None:
@@ -56,6 +98,9 @@ def generate_html_plot(
         except AttributeError:
             title = ""
 
+    if max_points is not None and len(data_table) > max_points:
+        data_table = downsample_table(data_table, max_points)
+
     p = data_table.plot_bokeh(
         kind=kind,
         show_figure=False,
@@ -68,18 +113,62 @@ def generate_html_plot(
         ylabel=ylabel,
     )
 
+    if webgl:
+        p.output_backend = "webgl"
+
     # override legend defaults
     p.legend.background_fill_alpha = 0
     p.legend.border_line_alpha = 0
     p.xaxis.major_label_orientation = math.pi / 4
     if ylabel is not None and "alert" in title.lower():
         p.yaxis.axis_label = "Number of Alerts"
-    return pandas_bokeh.embedded_html(p)
+    html = pandas_bokeh.embedded_html(p)
+    if compress:
+        return gzip.compress(html.encode("utf-8"))
+    return html
+
+
+def downsample_table(data_table: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Downsample the rows of a table for plotting.
+
+    Each numeric column is downsampled with the Largest-Triangle-Three-Buckets
+    (LTTB) algorithm, which keeps the visual shape of a series. The rows
+    selected for any column are kept for all columns.
+
+    Args:
+        data_table: A pandas DataFrame
+        max_points: The number of points to keep per column.
+
+    Returns:
+        The downsampled table, or the table as is if the tsdownsample
+        package is not installed.
+    """
+    try:
+        from tsdownsample import LTTBDownsampler
+    except ImportError:
+        logging.warning("tsdownsample is not installed, plotting every row.")
+        return data_table
+
+    downsampler = LTTBDownsampler()
+    selected_rows = [
+        downsampler.downsample(data_table[column].to_numpy(dtype=np.float64, na_value=0.0), n_out=max_points)
+        for column in data_table.select_dtypes("number").columns
+    ]
+    if not selected_rows:
+        return data_table
+
+    downsampled_table = data_table.iloc[np.unique(np.concatenate(selected_rows))]
+    downsampled_table.name = getattr(data_table, "name", None)
+    return downsampled_table
 
 
 def get_companies(con: pymysql.connections.Connection) -> CompanyMap:
     """Query the database for all companies.
 
+    The companies are only queried once per connection, later calls
+    with the same connection return the same dict until the connection
+    is handed out again by connect_to_database.
+
     Args:
         con: a pymysql database connectable
 
@@ -87,11 +176,15 @@ def get_companies(con: pymysql.connections.Connection) -> CompanyMap:
         A dict of companies like so:
           {company_id: 'company_name'}, ..
     """
-    companies = {}
-    cursor = con.cursor()
-    cursor.execute("select * from company")
-    for c_id, c_name in cursor.fetchall():
-        companies[c_id] = c_name
+    companies = _companies_by_connection.get(con)
+    if companies is not None:
+        return companies
+
+    # stream the rows with an unbuffered cursor instead of fetching them all first
+    with con.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute("SELECT id, name FROM company")
+        companies = {c_id: c_name for c_id, c_name in cursor}
+    _companies_by_connection[con] = companies
     return companies
 
 
@@ -109,10 +202,9 @@ def apply_company_selection_to_query(query: str, company_ids: list, selected_com
         An updated SQL query string.
 
     """
-    return query.format(
-        " AND " if company_ids else "",
-        "( " + " OR ".join(["company.name=%s" for company in selected_companies]) + ") " if company_ids else "",
-    )
+    if not company_ids or not selected_companies:
+        return query.format("", "")
+    return query.format(" AND ", f"company.name IN ({', '.join(['%s'] * len(selected_companies))}) ")
 
 
 def sanitize_table_name(table_name=None, keep_friendly=False) -> str:
@@ -129,92 +221,166 @@ def sanitize_table_name(table_name=None, keep_friendly=False) -> str:
        A santized name string.
     """
     if table_name is None:
-        return f"No name - {datetime.now().timestamp()}"
+        return f"No name - {next(_unique_name_ids)}"
 
     safe_name = table_name.strip()
 
     if not keep_friendly:
         # map the friendly names back to key name
-        for stat_key, stat_name in FRIENDLY_STAT_NAME_MAP.items():
-            if stat_name in safe_name:
-                safe_name = safe_name.replace(stat_name, stat_key)
+        safe_name = _FRIENDLY_STAT_NAME_RE.sub(lambda match: _FRIENDLY_STAT_NAME_KEYS[match.group(0)], safe_name)
 
-    _invalid_chars = ["\\", "*", "?", ":", "/", "[", "]"]
-    for invalid_char in _invalid_chars:
-        safe_name = safe_name.replace(invalid_char, "-")
+    return safe_name.translate(_INVALID_TABLE_NAME_CHARS)
 
-    return safe_name
 
-
-def dataframes_to_archive_bytes_of_json_files(tables: List[pd.DataFrame]) -> bytes:
-    """Create byte archive of tables as json files.
-
-    Convert each table to its json file bytestring. Put each bytestring
-    into a tar archive and return the tar.gz bytes of that archive.
-    Write to a file or send wherever.
+def _prepare_tables(tables: List[pd.DataFrame], keep_friendly=False) -> List[Tuple[str, str, pd.DataFrame]]:
+    """Name tables for export.
 
     Args:
         tables: A list of pd.DataFrames
+        keep_friendly: Passed to sanitize_table_name.
 
     Returns:
-        The bytestring of a tar.gz archive containing the
-        tables as json files.
+        A list of (table name, sanitized table name, table) tuples.
+        Tables without a name get a unique fallback name.
     """
-    buf = io.BytesIO()
-    tar = tarfile.open(mode="w:gz", fileobj=buf)
+    prepared_tables = []
     for table in tables:
-        if not table.name:
-            safe_table_name = sanitize_table_name()
+        if table.name:
+            table_name = table.name
+            safe_table_name = sanitize_table_name(table_name, keep_friendly=keep_friendly)
         else:
-            safe_table_name = sanitize_table_name(table.name, keep_friendly=True)
+            logging.warning("metric table has no name.")
+            table_name = safe_table_name = sanitize_table_name()
+        prepared_tables.append((table_name, safe_table_name, table))
+    return prepared_tables
 
-        table_buf = io.BytesIO()
-        table_bytes = table.to_json().encode("utf-8")
-        table_info = tarfile.TarInfo(name=f"{safe_table_name}.json")
-        table_info.size = len(table_bytes)
-        table_buf.write(table_bytes)
-        table_buf.seek(0)
-        tar.addfile(table_info, table_buf)
-        table_buf.close()
 
-    tar.close()
-    buf.seek(0)
-    filebytes = buf.read()
-    buf.close()
-    return filebytes
+def _string_labels(labels: List[Any]) -> List[str]:
+    """Convert labels to the unique string column names pyarrow requires.
 
+    MultiIndex labels are joined with " - " and names that collide get a
+    numbered suffix.
+    """
+    string_labels = []
+    seen_labels = set()
+    for label in labels:
+        label = " - ".join(map(str, label)) if isinstance(label, tuple) else str(label)
+        unique_label = label
+        n = 1
+        while unique_label in seen_labels:
+            n += 1
+            unique_label = f"{label} ({n})"
+        seen_labels.add(unique_label)
+        string_labels.append(unique_label)
+    return string_labels
+
+
+def _table_file_bytes(table: pd.DataFrame, table_format: str) -> bytes:
+    """Serialize a table to the bytes of a file in the given format."""
+    if table_format == "json":
+        return table.to_json().encode("utf-8")
+    buf = io.BytesIO()
+    if table_format == "parquet":
+        if not all(isinstance(label, str) for label in table.columns):
+            table = table.set_axis(_string_labels(list(table.columns)), axis=1)
+        table.to_parquet(buf)
+    else:
+        # feather can't store an index, write its levels as leading columns
+        index_labels = [
+            name if name is not None else "index" if table.index.nlevels == 1 else f"level_{level}"
+            for level, name in enumerate(table.index.names)
+        ]
+        # name the columns first so an index level is the one renamed on a collision
+        labels = _string_labels(list(table.columns) + index_labels)
+        flat_table = pd.concat([table.index.to_frame(index=False), table.reset_index(drop=True)], axis=1)
+        flat_table.columns = labels[len(table.columns) :] + labels[: len(table.columns)]
+        flat_table.to_feather(buf)
+    return buf.getvalue()
+
+
+def dataframes_to_archive_bytes_of_json_files(
+    tables: List[pd.DataFrame],
+    fileobj: Optional[BinaryIO] = None,
+    compression: str = "gz",
+    table_format: str = "json",
+) -> Optional[bytes]:
+    """Create byte archive of tables as json files.
+
+    Convert each table to the bytestring of a file in table_format (json
+    by default). Put each bytestring into a tar archive, compressed with
+    gzip (tar.gz) or zstd (tar.zst), and return the bytes of that archive
+    or stream it to fileobj. Write to a file or send wherever.
+
+    Args:
+        tables: A list of pd.DataFrames
+        fileobj: A writable binary file object to stream the archive to,
+          instead of returning its bytes.
+        compression: The archive compression, "gz" for a tar.gz archive or
+          "zst" for a tar.zst archive. zstd compression is much faster and
+          requires the zstandard package.
+        table_format: The file format of the tables in the archive, "json",
+          "parquet" or "feather". parquet and feather are much faster to
+          write and read than json and require the pyarrow package.
 
-def dataframes_to_xlsx_bytes(tables: List[pd.DataFrame]) -> bytes:
+    Returns:
+        The bytestring of a compressed tar archive containing the
+        tables as files of the given format, or None if the archive
+        was written to fileobj.
+    """
+    if compression not in ARCHIVE_COMPRESSIONS:
+        raise ValueError(f"unsupported archive compression: {compression}")
+    if table_format not in ARCHIVE_TABLE_FORMATS:
+        raise ValueError(f"unsupported archive table format: {table_format}")
+
+    buf = io.BytesIO() if fileobj is None else fileobj
+    out = buf
+    tar_mode = "w|gz"
+    if compression == "zst":
+        import zstandard
+
+        out = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(buf, closefd=False)
+        tar_mode = "w|"
+
+    # stream mode writes the archive as it goes, without seeking
+    with tarfile.open(mode=tar_mode, fileobj=out) as tar:
+        for _, safe_table_name, table in _prepare_tables(tables, keep_friendly=True):
+            table_bytes = _table_file_bytes(table, table_format)
+            table_info = tarfile.TarInfo(name=f"{safe_table_name}.{table_format}")
+            table_info.size = len(table_bytes)
+            tar.addfile(table_info, io.BytesIO(table_bytes))
+
+    if out is not buf:
+        # finish the zstd frame, buf is left open
+        out.close()
+
+    if fileobj is None:
+        return buf.getvalue()
+    return None
+
+
+def dataframes_to_xlsx_bytes(tables: List[pd.DataFrame], fileobj: Optional[BinaryIO] = None) -> Optional[bytes]:
     """Export dataframes to xlsx bytes.
 
     Write the bytes to a file or send them wherever.
 
     Args:
         tables: A list of pd.DataFrames
+        fileobj: A writable binary file object to write the xlsx file to,
+          instead of returning its bytes.
 
     Returns:
-        The bytestring representation of the xlsx file.
+        The bytestring representation of the xlsx file, or None
+        if the file was written to fileobj.
     """
-    tab_names = []
+    tab_names = set()
     tab_name_map = {}
     table_tab_map = {}
     # sanitize and make tab name map
-    for table in tables:
-        if table.name:
-            table_name = table.name
-        else:
-            logging.warning("metric table has no name.")
-            table_name = sanitize_table_name()
-        clean_table_name = sanitize_table_name(table.name)
-
+    for table_name, clean_table_name, table in _prepare_tables(tables):
         # do additional table name cleanup for excel
         # try to clean up alert_type names
         name_parts = clean_table_name.split(" - ")
-        if name_parts:
-            _tmp_name = ""
-            for part in name_parts[:-1]:
-                _tmp_name += f"{part[0].upper()}-"
-            clean_table_name = f"{_tmp_name}{name_parts[-1]}"
+        clean_table_name = "".join(f"{part[0].upper()}-" for part in name_parts[:-1]) + name_parts[-1]
 
         # openpyxl guidance to keep names to 31 chars or less
         if len(clean_table_name) > 31:
@@ -222,41 +388,98 @@ def dataframes_to_xlsx_bytes(tables: List[pd.DataFrame]) -> bytes:
 
         if clean_table_name in tab_names:
             logging.warning(f"name collision for {clean_table_name}")
-            # 30 char collision name
-            clean_table_name = f"Collision - {datetime.now().timestamp()}"
+            clean_table_name = f"Collision - {next(_unique_name_ids)}"
 
-        tab_names.append(clean_table_name)
+        tab_names.add(clean_table_name)
 
         logging.debug(f"changed table name from '{table_name}' to '{clean_table_name}'")
         # will add this helpful info to the excel sheet
         tab_name_map[clean_table_name] = table_name
         table_tab_map[clean_table_name] = table
 
-    xlsx_bytes = io.BytesIO()
-    writer = pd.ExcelWriter(xlsx_bytes)
+    xlsx_bytes = io.BytesIO() if fileobj is None else fileobj
+    # constant_memory flushes each row to a temporary file as soon as the next
+    # one is started, so every sheet must be written row by row, top to bottom.
+    # in_memory must stay off, xlsxwriter turns constant_memory off with it.
+    # Table strings are data, so don't spend time checking them for formulas or urls.
+    workbook = xlsxwriter.Workbook(
+        xlsx_bytes,
+        {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            "strings_to_formulas": False,
+            "strings_to_urls": False,
+        },
+    )
+    header_format = workbook.add_format({"bold": True})
+
     # write the tab name map first
     tab_name_map_df = pd.DataFrame.from_dict(tab_name_map, orient="index", columns=["ACE Data Table Name"])
     tab_name_map_df.index.names = ["Tab Name"]
-    tab_name_map_df.to_excel(writer, "Tab Name Map")
+    _write_xlsx_sheet(workbook.add_worksheet("Tab Name Map"), tab_name_map_df, header_format)
 
     # write the tables to excel tabs
     for name, table in table_tab_map.items():
         try:
-            table.to_excel(writer, name)
+            _write_xlsx_sheet(workbook.add_worksheet(name), table, header_format)
         except Exception as e:
             logging.error(f"failed to write table: {e}")
 
-    writer.close()
-    xlsx_bytes.seek(0)
-    filebytes = xlsx_bytes.read()
-    xlsx_bytes.close()
+    workbook.close()
+
+    if fileobj is None:
+        return xlsx_bytes.getvalue()
+    return None
+
+
+def _xlsx_cell_value(value: Any) -> Any:
+    """Convert a table value to something xlsxwriter can write."""
+    if isinstance(value, (str, bool, numbers.Number, datetime, timedelta, time)):
+        if pd.isna(value):
+            return None
+        if isinstance(value, numbers.Number) and value in (math.inf, -math.inf):
+            # xlsx has no infinity, write it like DataFrame.to_excel's default inf_rep
+            return "inf" if value > 0 else "-inf"
+        return value
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    return str(value)
+
 
-    return filebytes
+def _write_xlsx_sheet(worksheet, table: pd.DataFrame, header_format) -> None:
+    """Write a table, with its index, to a worksheet one row at a time.
+
+    Args:
+        worksheet: An xlsxwriter worksheet.
+        table: The pd.DataFrame to write.
+        header_format: The xlsxwriter format for the header rows.
+    """
+    index_names = ["" if name is None else name for name in table.index.names]
+    row_num = 0
+    for level in range(table.columns.nlevels):
+        # the index names go with the last header row
+        labels = index_names if level == table.columns.nlevels - 1 else [""] * len(index_names)
+        worksheet.write_row(row_num, 0, labels + list(table.columns.get_level_values(level)), header_format)
+        row_num += 1
+
+    multi_index = table.index.nlevels > 1
+    for index, *values in table.itertuples(name=None):
+        row = list(index) if multi_index else [index]
+        row.extend(values)
+        worksheet.write_row(row_num, 0, [_xlsx_cell_value(value) for value in row])
+        row_num += 1
 
 
 def connect_to_database(config: configparser.SectionProxy) -> pymysql.connections.Connection:
     """Connect to a configured ACE DB.
 
+    Connections are kept open and reused by later calls from the same
+    thread for the same host, user and database. A reused connection is
+    pinged first, and reconnected if the server closed it. Connections
+    autocommit and any transaction left open on a reused connection is
+    rolled back, so every caller reads the current data instead of an
+    old transaction snapshot.
+
     Args:
         config: A configparser section that defines
           the database connection.
@@ -266,6 +489,19 @@ def connect_to_database(config: configparser.SectionProxy) -> pymysql.connection
     """
     from getpass import getpass
 
+    connections = _thread_connections.__dict__.setdefault("connections", {})
+    connection_key = (config["host"], config["user"], config["database"])
+    db = connections.get(connection_key)
+    if db is not None:
+        try:
+            db.ping(reconnect=True)
+            db.rollback()
+            # each caller of connect_to_database gets a fresh company map
+            _companies_by_connection.pop(db, None)
+            return db
+        except pymysql.MySQLError as e:
+            logging.warning(f"failed to reuse database connection: {e}")
+
     ssl_settings = None
     if os.path.exists(config.get("ssl_ca_path")):
         ssl_settings = {"ca": config["ssl_ca_path"]}
@@ -275,16 +511,17 @@ def connect_to_database(config: configparser.SectionProxy) -> pymysql.connection
         password = getpass(f"Enter password for {config['user']}@{config['host']}: ")
 
     db = pymysql.connect(
-        host=config["host"], user=config["user"], password=password, database=config["database"], ssl=ssl_settings
+        host=config["host"],
+        user=config["user"],
+        password=password,
+        database=config["database"],
+        ssl=ssl_settings,
+        autocommit=True,
     )
+    connections[connection_key] = db
     return db
 
 
 def get_month_keys_between_two_dates(start_date: datetime, end_date: datetime) -> list:
     """Get unique %Y%m (Months) between dates."""
-    months = []
-    while start_date <= end_date:
-        months.append(datetime.strftime(start_date, "%Y%m"))
-        start_date += relativedelta(months=1)
-
-    return months
+    return pd.period_range(start_date, end_date, freq="M").strftime("%Y%m").tolist()
@@ -16,6 +16,10 @@ from flask import Flask
 from .database import DASH_CONFIG, get_last_update_time, initialize_database, update_database
 from .helpers import change_color_brightness
 
+# Dash serializes figures through plotly.io.json; orjson is much faster
+# than the stdlib encoder on the datetime and numpy heavy chart payloads.
+pio.json.config.default_engine = "orjson"
+
 
 class FilteredThemeChangerAIO(ThemeChangerAIO):
     """Subclass of ThemeChangerAIO to exclude specific themes."""
@@ -1,12 +1,18 @@
 """Utility functions for database operations and plotting."""
 
+import functools
 import sqlite3
-from typing import Dict, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 from .database import DATA_DIR
 
+# First month of a fiscal year, which is named after the year it ends in
+FISCAL_YEAR_START_MONTH = 10
+
 VALID_TABLE_NAMES_MAP = {
     "alert_count": "Alert Quantities by Disposition",
     "alert_type_quantities": "Alert Type Category Quantities",
@@ -26,13 +32,18 @@ VALID_TABLE_NAMES_MAP = {
 }
 
 
-def fetch_data(tables: List[str], clean_column_names: bool = False) -> Dict[str, pd.DataFrame]:
+def fetch_data(
+    tables: List[str], clean_column_names: bool = False, index_col: Optional[str] = None
+) -> Dict[str, pd.DataFrame]:
     """Fetch tables from SQLite database.
 
+    Rows are returned sorted by their month key.
+
     Args:
         tables: A list of table names to fetch data from.
         clean_column_names: Flag to clean column names (rename 'index'
           to 'month' and lowercase all column names).
+        index_col: Column to use as the index of the DataFrames, if any.
 
     Returns:
         A dictionary where keys are table names and values are
@@ -41,19 +52,58 @@ def fetch_data(tables: List[str], clean_column_names: bool = False) -> Dict[str,
     Raises:
         ValueError: If any of the table names provided are not valid.
     """
-    conn = sqlite3.connect(f"{DATA_DIR}/ace_metrics_database.sqlite")
-    df_dict = {}
+    tables = list(tables)
     for table in tables:
         if table not in VALID_TABLE_NAMES_MAP:
             raise ValueError("Invalid table name")
-        df = pd.read_sql_query(f"SELECT * FROM {table};", conn)
-        df.name = VALID_TABLE_NAMES_MAP[table]
-        if clean_column_names:
-            df.rename(columns={"index": "month"}, inplace=True)
-            df.columns = df.columns.str.lower()
-        df_dict[f"{table}"] = df
-    conn.close()
-    return df_dict
+
+    def read(table: str) -> pd.DataFrame:
+        return _read_table(table, clean_column_names, index_col)
+
+    if len(tables) > 1:
+        # sqlite releases the GIL while querying, so read the tables concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(tables))) as executor:
+            dfs = list(executor.map(read, tables))
+    else:
+        dfs = [read(table) for table in tables]
+    return dict(zip(tables, dfs))
+
+
+def fetch_months(table: str) -> List[str]:
+    """Fetch the month keys of a table from SQLite database.
+
+    Args:
+        table: The table name to fetch the month keys of.
+
+    Returns:
+        A sorted list of the `YYYYMM` keys in the table.
+
+    Raises:
+        ValueError: If the table name provided is not valid.
+    """
+    if table not in VALID_TABLE_NAMES_MAP:
+        raise ValueError("Invalid table name")
+    conn = sqlite3.connect(f"{DATA_DIR}/ace_metrics_database.sqlite")
+    try:
+        rows = conn.execute(f"SELECT DISTINCT month FROM {table} ORDER BY 1;").fetchall()
+    finally:
+        conn.close()
+    return [month for (month,) in rows]
+
+
+def _read_table(table: str, clean_column_names: bool, index_col: Optional[str]) -> pd.DataFrame:
+    """Read one table from the SQLite database with its own connection."""
+    conn = sqlite3.connect(f"{DATA_DIR}/ace_metrics_database.sqlite")
+    try:
+        # The month key is always the first column of a metrics table
+        df = pd.read_sql_query(f"SELECT * FROM {table} ORDER BY 1;", conn, index_col=index_col)
+    finally:
+        conn.close()
+    df.name = VALID_TABLE_NAMES_MAP[table]
+    if clean_column_names:
+        df.rename(columns={"index": "month"}, inplace=True)
+        df.columns = df.columns.str.lower()
+    return df
 
 
 def to_ordinal(n: int) -> str:
@@ -64,15 +114,63 @@ def to_ordinal(n: int) -> str:
     return str(n) + suffix
 
 
+@functools.lru_cache(maxsize=None)
+def ordinal_labels(n: int) -> Tuple[str, ...]:
+    """Get the ordinal representations of the ranks 1 through n."""
+    return tuple(to_ordinal(i + 1) for i in range(n))
+
+
+def rank_columns(df: pd.DataFrame, label_prefix: str) -> pd.DataFrame:
+    """Rank the rows of a DataFrame within each of its columns.
+
+    Args:
+        df: A DataFrame of values to rank, labeled by its index.
+        label_prefix: Prefix of the label column added for each column.
+
+    Returns:
+        A DataFrame with an ordinal `rank` column followed by, for each
+          column of `df`, a `{label_prefix}_{column}` column with the row
+          labels and a `{column}` column with the values, both sorted in
+          descending order of value.
+    """
+    values = df.to_numpy()
+    labels = df.index.to_numpy()
+    order = np.argsort(-values, axis=0, kind="stable")
+
+    ranked = {"rank": list(ordinal_labels(len(df)))}
+    for col_idx, column in enumerate(df.columns):
+        ranked[f"{label_prefix}_{column}"] = labels[order[:, col_idx]]
+        ranked[column] = values[order[:, col_idx], col_idx]
+    return pd.DataFrame(ranked)
+
+
 def to_fiscal_year(year_month_str: str) -> str:
     """Convert a `YYYYMM` string to its corresponding fiscal year."""
     year = int(year_month_str[:4])
     month = int(year_month_str[4:])
-    if month >= 10:
+    if month >= FISCAL_YEAR_START_MONTH:
         year += 1
     return str(year)
 
 
+def to_fiscal_years(year_months: pd.Index) -> np.ndarray:
+    """Convert `YYYYMM` keys to their corresponding fiscal years.
+
+    Vectorized version of `to_fiscal_year` for a whole index of months.
+    """
+    year_months = np.asarray(year_months, dtype=np.int64)
+    years, months = np.divmod(year_months, 100)
+    return np.where(months >= FISCAL_YEAR_START_MONTH, years + 1, years).astype(str)
+
+
+def _visible_x_bounds(x_axis: List, x_range: List[float]) -> Tuple:
+    """Get the first and last x values shown within an axis range."""
+    return (
+        x_axis[max(0, int(-(-x_range[0] // 1)))],
+        x_axis[min(int(x_range[1] // 1), len(x_axis) - 1)],
+    )
+
+
 def double_click_reset_y_range(
     fig_data: List[Dict], fig_layout: Dict, side_by_side_plot: bool = False
 ) -> Union[Tuple[float, float], List[Tuple[float, float]]]:
@@ -89,10 +187,10 @@ def double_click_reset_y_range(
           for each plot.
     """
     x_axis = fig_data[0]["x"]
-    cur_xrange = fig_layout["xaxis"]["range"]
+    x_bounds = _visible_x_bounds(x_axis, fig_layout["xaxis"]["range"])
     y1_min, y1_max = float("inf"), float("-inf")
     if side_by_side_plot:
-        cur_xrange2 = fig_layout["xaxis2"]["range"]
+        x2_bounds = _visible_x_bounds(x_axis, fig_layout["xaxis2"]["range"])
         y2_min, y2_max = float("inf"), float("-inf")
     # Loop through all traces to find the min and max y-values within
     # the current x-axis range of each subplot
@@ -100,27 +198,27 @@ def double_click_reset_y_range(
         if trace.get("visible") == "legendonly":
             continue  # Skip this trace if it's not visible
 
-        x_values, y_values = trace["x"], trace["y"]
-
-        for x, y in zip(x_values, y_values):
-            # Since both subplots share the legends from the first plot,
-            # the second subplot will have showlegend=False.
-            if "showlegend" not in trace or trace.get("showlegend") is True:
-                if (
-                    x_axis[max(0, int(-(-cur_xrange[0] // 1)))]
-                    <= x
-                    <= x_axis[min(int(cur_xrange[1] // 1), len(x_axis) - 1)]
-                ):
-                    y1_min = min(y1_min, y)
-                    y1_max = max(y1_max, y)
-            elif side_by_side_plot:
-                if (
-                    x_axis[max(0, int(-(-cur_xrange2[0] // 1)))]
-                    <= x
-                    <= x_axis[min(int(cur_xrange2[1] // 1), len(x_axis) - 1)]
-                ):
-                    y2_min = min(y2_min, y)
-                    y2_max = max(y2_max, y)
+        # Since both subplots share the legends from the first plot,
+        # the second subplot will have showlegend=False.
+        first_subplot = "showlegend" not in trace or trace.get("showlegend") is True
+        if not first_subplot and not side_by_side_plot:
+            continue
+
+        x_lo, x_hi = x_bounds if first_subplot else x2_bounds
+        x_values = np.asarray(trace["x"])
+        y_values = np.asarray(trace["y"], dtype=np.float64)
+        y_visible = y_values[(x_values >= x_lo) & (x_values <= x_hi)]
+        # null y values are gaps in the trace, not part of its range
+        y_visible = y_visible[~np.isnan(y_visible)]
+        if not y_visible.size:
+            continue
+
+        if first_subplot:
+            y1_min = min(y1_min, float(y_visible.min()))
+            y1_max = max(y1_max, float(y_visible.max()))
+        else:
+            y2_min = min(y2_min, float(y_visible.min()))
+            y2_max = max(y2_max, float(y_visible.max()))
     if side_by_side_plot:
         return [(y1_min, y1_max), (y2_min, y2_max)]
     return (y1_min, y1_max)
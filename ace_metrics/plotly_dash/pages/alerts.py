@@ -20,10 +20,11 @@ Raises:
     PreventUpdate: If no update is required or possible.
 """
 
-from typing import Dict, List, Union
+from typing import Dict, List, Tuple, Union
 
 import dash
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -31,11 +32,39 @@ from dash import Input, Output, State, callback, dcc
 from plotly.subplots import make_subplots
 
 from ace_metrics.plotly_dash.app import chart_config
-from ace_metrics.plotly_dash.helpers import double_click_reset_y_range, fetch_data, to_fiscal_year, to_ordinal
+from ace_metrics.plotly_dash.helpers import double_click_reset_y_range, fetch_data, rank_columns, to_fiscal_years
 
 dash.register_page(__name__, path="/")
 
 
+# Months of history sent to the browser by the monthly line charts
+_MAX_CHART_MONTHS = 120
+
+# Columns hidden by the "Default" view of the side-by-side charts
+_DEFAULT_VIEW_HIDDEN_COLS = ["exploitation+installation", "actions_on_objectives", "recon+weaponization"]
+# Columns shown by the "Critical" view of the side-by-side charts
+_CRITICAL_VIEW_COLS = _DEFAULT_VIEW_HIDDEN_COLS + ["command_and_control"]
+
+# Columns plotted by the side-by-side charts, "month" first
+_SIDE_BY_SIDE_COLS = [
+    "month",
+    "exploitation+installation",
+    "command_and_control",
+    "actions_on_objectives",
+    "recon+weaponization",
+    "false_positive",
+    "exploitation",
+    "installation",
+    "exfil",
+    "damage",
+    "delivery",
+    "policy_violation",
+    "grayware",
+    "weaponization",
+    "reconnaissance",
+]
+
+
 def extended_df(df: pd.DataFrame) -> pd.DataFrame:
     """Add more columns to the DataFrame."""
     df = df.copy(deep=True)
@@ -47,6 +76,38 @@ def extended_df(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _side_by_side_view_button(
+    label: str, view: np.ndarray, number_of_months: int, y_ranges: Tuple[Tuple[float, float], Tuple[float, float]]
+) -> Dict:
+    """Create an update button that switches a side-by-side chart view.
+
+    Args:
+        label: The button label.
+        view: A boolean mask of the plotted columns shown by the view.
+        number_of_months: The number of months in the chart.
+        y_ranges: The (min, max) y-axis range of each subplot.
+    """
+    (y1_min, y1_max), (y2_min, y2_max) = y_ranges
+    return dict(
+        method="update",
+        label=label,
+        args=[
+            # Each column is plotted as two traces, one per subplot
+            {"visible": [True if visible else "legendonly" for visible in view for _ in range(2)]},
+            {
+                "xaxis.range[0]": number_of_months - 13,
+                "xaxis2.range[0]": number_of_months - 13,
+                "xaxis.range[1]": number_of_months - 1,
+                "xaxis2.range[1]": number_of_months - 1,
+                "yaxis.range[0]": y1_min,
+                "yaxis2.range[0]": y2_min,
+                "yaxis.range[1]": y1_max,
+                "yaxis2.range[1]": y2_max,
+            },
+        ],
+    )
+
+
 def update_side_by_side_chart(
     relayoutData: Dict, current_fig: Dict, template: Dict, table: str, chart_title: str
 ) -> Union[Dict, go.Figure]:
@@ -62,25 +123,8 @@ def update_side_by_side_chart(
     if not current_fig and relayoutData:
         df = extended_df(fetch_data([table], True)[table])
         df_bh = extended_df(fetch_data([f"{table}_BH"], True)[f"{table}_BH"])
-        included_cols = [
-            "month",
-            "exploitation+installation",
-            "command_and_control",
-            "actions_on_objectives",
-            "recon+weaponization",
-            "false_positive",
-            "exploitation",
-            "installation",
-            "exfil",
-            "damage",
-            "delivery",
-            "policy_violation",
-            "grayware",
-            "weaponization",
-            "reconnaissance",
-        ]
-        df = df[included_cols]
-        df_bh = df_bh[included_cols]
+        df = df[_SIDE_BY_SIDE_COLS].tail(_MAX_CHART_MONTHS)
+        df_bh = df_bh[_SIDE_BY_SIDE_COLS].tail(_MAX_CHART_MONTHS)
 
         fig = make_subplots(
             rows=1,
@@ -124,70 +168,19 @@ def update_side_by_side_chart(
         fig.update_yaxes(range=[0, df_bh.tail(13).iloc[:, 1:].max().max()], row=1, col=2)
 
         number_of_months = len(df["month"])
-        y1_min, y1_max, y2_min, y2_max = float("inf"), float("-inf"), float("inf"), float("-inf")
-        y1_min_crit, y1_max_crit, y2_min_crit, y2_max_crit = float("inf"), float("-inf"), float("inf"), float("-inf")
-        x_axis = fig.data[0]["x"]
-        for trace in fig.data:
-            x_values, y_values = trace["x"], trace["y"]
-            for x, y in zip(x_values, y_values):
-                if x_axis[number_of_months - 13] <= x <= x_axis[number_of_months - 1]:
-                    if trace.legendgroup not in ["group0", "group2", "group3"]:  # Default View
-                        if trace["showlegend"] is None:  # First subplot
-                            y1_min = min(y1_min, y)
-                            y1_max = max(y1_max, y)
-                        else:
-                            y2_min = min(y2_min, y)
-                            y2_max = max(y2_max, y)
-                    else:  # Critical View
-                        if trace["showlegend"] is None:  # First subplot
-                            y1_min_crit = min(y1_min_crit, y)
-                            y1_max_crit = max(y1_max_crit, y)
-                        else:
-                            y2_min_crit = min(y2_min_crit, y)
-                            y2_max_crit = max(y2_max_crit, y)
+        # Visibility masks over the plotted columns, one entry per column
+        default_view = ~np.isin(df.columns[1:], _DEFAULT_VIEW_HIDDEN_COLS)
+        critical_view = np.isin(df.columns[1:], _CRITICAL_VIEW_COLS)
+        recent = df.iloc[-13:, 1:].to_numpy(dtype=np.float64)
+        recent_bh = df_bh.iloc[-13:, 1:].to_numpy(dtype=np.float64)
+        y1_min, y1_max = recent[:, default_view].min(), recent[:, default_view].max()
+        y2_min, y2_max = recent_bh[:, default_view].min(), recent_bh[:, default_view].max()
+        y1_min_crit, y1_max_crit = recent[:, critical_view].min(), recent[:, critical_view].max()
+        y2_min_crit, y2_max_crit = recent_bh[:, critical_view].min(), recent_bh[:, critical_view].max()
         buttons = [
-            dict(
-                method="update",
-                label="Default",
-                args=[
-                    {
-                        "visible": [
-                            True if trace.legendgroup not in ["group0", "group2", "group3"] else "legendonly"
-                            for trace in fig.data
-                        ],
-                    },
-                    {
-                        "xaxis.range[0]": number_of_months - 13,
-                        "xaxis2.range[0]": number_of_months - 13,
-                        "xaxis.range[1]": number_of_months - 1,
-                        "xaxis2.range[1]": number_of_months - 1,
-                        "yaxis.range[0]": y1_min,
-                        "yaxis2.range[0]": y2_min,
-                        "yaxis.range[1]": y1_max,
-                        "yaxis2.range[1]": y2_max,
-                    },
-                ],
-            ),
-            dict(
-                method="update",
-                label="Critical",
-                args=[
-                    {
-                        "visible": [
-                            True if trace.legendgroup in ["group0", "group1", "group2", "group3"] else "legendonly"
-                            for trace in fig.data
-                        ],
-                    },
-                    {
-                        "xaxis.range[0]": number_of_months - 13,
-                        "xaxis2.range[0]": number_of_months - 13,
-                        "xaxis.range[1]": number_of_months - 1,
-                        "yaxis.range[0]": y1_min_crit,
-                        "yaxis2.range[0]": y2_min_crit,
-                        "yaxis.range[1]": y1_max_crit,
-                        "yaxis2.range[1]": y2_max_crit,
-                    },
-                ],
+            _side_by_side_view_button("Default", default_view, number_of_months, ((y1_min, y1_max), (y2_min, y2_max))),
+            _side_by_side_view_button(
+                "Critical", critical_view, number_of_months, ((y1_min_crit, y1_max_crit), (y2_min_crit, y2_max_crit))
             ),
         ]
 
@@ -211,103 +204,53 @@ def update_side_by_side_chart(
         return fig
 
     if current_fig and relayoutData == {}:
+        y_ranges = double_click_reset_y_range(current_fig["data"], current_fig["layout"], True)
+        current_y_ranges = [current_fig["layout"]["yaxis"].get("range"), current_fig["layout"]["yaxis2"].get("range")]
+        if current_y_ranges == [list(y_range) for y_range in y_ranges]:
+            # Nothing to reset, don't send the same figure back
+            raise dash.exceptions.PreventUpdate
+
         # Update the y-axis range
-        current_fig["layout"]["yaxis"]["range"], current_fig["layout"]["yaxis2"]["range"] = double_click_reset_y_range(
-            current_fig["data"], current_fig["layout"], True
-        )
+        current_fig["layout"]["yaxis"]["range"], current_fig["layout"]["yaxis2"]["range"] = y_ranges
 
         return current_fig
 
     raise dash.exceptions.PreventUpdate
 
 
+_FULL_WIDTH = {"size": 12, "order": "last", "offset": 0}
+_HALF_WIDTH = {"size": 6, "order": "last", "offset": 0}
+_CHART_STYLE = {"height": 405}
+_TALL_CHART_STYLE = {"height": 480}
+
+_ALERT_COUNT_GRAPH = dcc.Graph(id="alert-count", config=chart_config, style=_CHART_STYLE)
+_YEARLY_ALERT_RANK_GRAPH = dcc.Graph(id="yearly-alert-rank", config=chart_config, style=_CHART_STYLE)
+_ALERT_SLA_GRAPH = dcc.Graph(id="alert-sla", config=chart_config, style=_CHART_STYLE)
+_ALERT_BY_ANALYST_GRAPH = dcc.Graph(id="alert-by-analyst", config=chart_config, style=_CHART_STYLE)
+_ALERT_COUNT_BY_TYPE_GRAPH = dcc.Graph(id="alert-count-by-type", config=chart_config, style=_CHART_STYLE)
+_TOTAL_OPEN_TIME_GRAPH = dcc.Graph(id="total-open-time", config=chart_config, style=_TALL_CHART_STYLE)
+_AVG_TIME_TO_DISPO_GRAPH = dcc.Graph(id="avg-time-to-dispo", config=chart_config, style=_TALL_CHART_STYLE)
+_STD_TIME_TO_DISPO_GRAPH = dcc.Graph(id="std-time-to-dispo", config=chart_config, style=_TALL_CHART_STYLE)
+
 layout = dbc.Container(
     [
+        dbc.Row([dbc.Col([_ALERT_COUNT_GRAPH], width=_FULL_WIDTH)], className="mb-3"),
         dbc.Row(
             [
-                dbc.Col(
-                    [
-                        dcc.Graph(id="alert-count", config=chart_config, style={"height": 405}),
-                    ],
-                    width={"size": 12, "order": "last", "offset": 0},
-                ),
-            ],
-            className="mb-3",
-        ),
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        dcc.Graph(
-                            id="yearly-alert-rank",
-                            config=chart_config,
-                            style={"height": 405},
-                        ),
-                    ],
-                    width={"size": 6, "order": "last", "offset": 0},
-                ),
-                dbc.Col(
-                    [
-                        dcc.Graph(
-                            id="alert-sla",
-                            config=chart_config,
-                            style={"height": 405},
-                        ),
-                    ],
-                    width={"size": 6, "order": "last", "offset": 0},
-                ),
+                dbc.Col([_YEARLY_ALERT_RANK_GRAPH], width=_HALF_WIDTH),
+                dbc.Col([_ALERT_SLA_GRAPH], width=_HALF_WIDTH),
             ]
         ),
         dbc.Row(
             [
-                dbc.Col(
-                    [
-                        dcc.Graph(id="alert-by-analyst", config=chart_config, style={"height": 405}),
-                    ],
-                    width={"size": 6, "order": "last", "offset": 0},
-                ),
-                dbc.Col(
-                    [
-                        dcc.Graph(id="alert-count-by-type", config=chart_config, style={"height": 405}),
-                    ],
-                    width={"size": 6, "order": "last", "offset": 0},
-                ),
-            ],
-            className="mb-3",
-        ),
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        dcc.Graph(id="total-open-time", config=chart_config, style={"height": 480}),
-                    ],
-                    width={"size": 12, "order": "last", "offset": 0},
-                ),
-            ],
-            className="mb-3",
-        ),
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        dcc.Graph(id="avg-time-to-dispo", config=chart_config, style={"height": 480}),
-                    ],
-                    width={"size": 12, "order": "last", "offset": 0},
-                ),
-            ],
-            className="mb-3",
-        ),
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        dcc.Graph(id="std-time-to-dispo", config=chart_config, style={"height": 480}),
-                    ],
-                    width={"size": 12, "order": "last", "offset": 0},
-                ),
+                dbc.Col([_ALERT_BY_ANALYST_GRAPH], width=_HALF_WIDTH),
+                dbc.Col([_ALERT_COUNT_BY_TYPE_GRAPH], width=_HALF_WIDTH),
             ],
             className="mb-3",
         ),
+        dbc.Row([dbc.Col([_TOTAL_OPEN_TIME_GRAPH], width=_FULL_WIDTH)], className="mb-3"),
+        dbc.Row([dbc.Col([_AVG_TIME_TO_DISPO_GRAPH], width=_FULL_WIDTH)], className="mb-3"),
+        dbc.Row([dbc.Col([_STD_TIME_TO_DISPO_GRAPH], width=_FULL_WIDTH)], className="mb-3"),
     ]
 )
 
@@ -342,7 +285,7 @@ def update_alert_count(relayoutData: Dict, template_data: Dict[str, Dict], curre
                 # "reviewed",
                 # "unknown",
             ]
-        ]
+        ].tail(_MAX_CHART_MONTHS)
 
         fig = px.line(
             df,
@@ -443,23 +386,12 @@ def update_yearly_alert_ranks(
         last_12_months = df.tail(12).sum()
         last_12_months.name = "last_12_months"
 
-        df["fiscal_year"] = df.index.astype(str).to_series().apply(to_fiscal_year)
-        df = df.groupby("fiscal_year").sum()
-        df = df.append([last_6_months, last_12_months])
+        df["fiscal_year"] = pd.Categorical(to_fiscal_years(df.index))
+        df = df.groupby("fiscal_year", observed=True).sum()
+        df = pd.concat([df, pd.DataFrame([last_6_months, last_12_months])])
 
         df = df[selected_columns].T
-        sorted_df = pd.DataFrame()
-
-        for year_time in df.columns:
-            temp_df = df.sort_values(by=year_time, ascending=False).reset_index()
-            temp_df["rank"] = temp_df.index.map(lambda x: f"{to_ordinal(x+1)}")
-            temp_df = temp_df.rename(columns={"index": f"alert_type_{year_time}"})
-            temp_df = temp_df[["rank", f"alert_type_{year_time}", year_time]]
-
-            if sorted_df.empty:
-                sorted_df = temp_df
-            else:
-                sorted_df = pd.merge(sorted_df, temp_df, on="rank", how="outer")
+        sorted_df = rank_columns(df, "alert_type")
         # Create the figure
         fig = go.Figure()
         for year_time in df.columns:
@@ -547,7 +479,7 @@ def update_yearly_alert_ranks(
 def update_alert_sla(relayoutData: Dict, template_data: Dict[str, Dict], current_fig: Dict) -> Union[go.Figure, Dict]:
     """Update or create a monthly alerts SLA line chart."""
     if not current_fig and relayoutData:
-        df = fetch_data(["overall_operating_alert"], True)["overall_operating_alert"].set_index("month")
+        df = fetch_data(["overall_operating_alert"], True, index_col="month")["overall_operating_alert"]
         df = df[["bh_cycletime_avg", "real_cycletime_avg"]]
         fig = px.line(
             df,
@@ -599,12 +531,11 @@ def update_alert_by_analyst(
 ) -> Union[Dict, go.Figure]:
     """Update or create a line chart for alerts dispo'ed by analyst."""
     if not current_fig and relayoutData:
-        df = fetch_data(["analyst_alert_quantities"], True)["analyst_alert_quantities"].set_index("month")
-        df.sort_index(inplace=True)
+        df = fetch_data(["analyst_alert_quantities"], True, index_col="month")["analyst_alert_quantities"]
 
         # Drop inactive users since last year
-        sum_last_12_months = df.tail(12).sum()
-        df.drop(columns=sum_last_12_months[sum_last_12_months == 0].index.tolist(), inplace=True)
+        active = df.iloc[-12:].to_numpy(dtype=np.float64).sum(axis=0) != 0
+        df = df.loc[:, active]
 
         fig = px.line(
             df,
@@ -645,8 +576,7 @@ def update_alert_count_by_type(
 ) -> Union[go.Figure, Dict]:
     """Update or create a line chart for alert quantities by type."""
     if not current_fig and relayoutData:
-        df = fetch_data(["alert_type_quantities"], True)["alert_type_quantities"].set_index("month")
-        df.sort_index(inplace=True)
+        df = fetch_data(["alert_type_quantities"], True, index_col="month")["alert_type_quantities"]
 
         fig = px.line(
             df,
@@ -17,38 +17,97 @@ Raises:
     PreventUpdate: If no update is required or possible.
 """
 
-from typing import Dict, List, Union
+import functools
+from typing import Dict, List, Optional, Union
 
 import dash
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from dash import Input, Output, State, callback, dcc
+from plotly.subplots import make_subplots
 
 from ace_metrics.plotly_dash.app import chart_config
-from ace_metrics.plotly_dash.helpers import double_click_reset_y_range, to_fiscal_year, to_ordinal, fetch_data
+from ace_metrics.plotly_dash.database import get_last_update_time
+from ace_metrics.plotly_dash.helpers import (
+    double_click_reset_y_range,
+    fetch_data,
+    fetch_months,
+    rank_columns,
+    to_fiscal_years,
+)
 
 dash.register_page(__name__, path="/hours-of-operations")
 
+_CYCLE_TIME_AVERAGE_COLUMN_LABELS = {
+    "bh_day_cycle_time_averages": "Business Hours",
+    "nights_cycle_time_averages": "Nights",
+    "weekend_cycle_time_averages": "Weekend",
+}
+_QUANTITY_COLUMN_LABELS = {
+    "bh_day_quantities": "Business Hours",
+    "nights_quantities": "Nights",
+    "weekend_quantities": "Weekend",
+}
+
 
 def generate_yearly_alert_count_df(hours_of_operation_df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate alert counts by operating hours per fiscal year."""
-    df = hours_of_operation_df.copy(True).set_index("month")
-    df = df[["bh_day_quantities", "nights_quantities", "weekend_quantities"]]
+    # set_index and the column selection both build new frames, no copy needed
+    df = hours_of_operation_df.set_index("month").loc[:, list(_QUANTITY_COLUMN_LABELS)]
 
     total = df.sum()
     total.name = "total"
     last_12_months = df.tail(12).sum()
     last_12_months.name = "last_12_months"
 
-    df = df.assign(fiscal_year=df.index.astype(str).to_series().apply(to_fiscal_year))
-    df = df.groupby("fiscal_year").sum()
+    df = df.assign(fiscal_year=pd.Categorical(to_fiscal_years(df.index)))
+    df = df.groupby("fiscal_year", observed=True).sum()
 
-    df = df.append([last_12_months, total])
+    df = pd.concat([df, pd.DataFrame([last_12_months, total])])
     return df
 
 
+@functools.lru_cache(maxsize=4)
+def _cached_hours_of_operation_df(last_update_time: str) -> pd.DataFrame:
+    """Fetch the hours of operation table for a database version."""
+    return fetch_data(["hours_of_operation"], True)["hours_of_operation"]
+
+
+def get_hours_of_operation_df() -> pd.DataFrame:
+    """Get the hours of operation table, only fetched again after database updates.
+
+    The returned DataFrame is shared between callers and must not be modified.
+    """
+    return _cached_hours_of_operation_df(get_last_update_time())
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_yearly_alert_count_df(last_update_time: str) -> pd.DataFrame:
+    """Build the yearly alert count DataFrame for a database version."""
+    return generate_yearly_alert_count_df(get_hours_of_operation_df())
+
+
+def get_yearly_alert_count_df() -> pd.DataFrame:
+    """Get the yearly alert count DataFrame, only rebuilt after database updates.
+
+    The returned DataFrame is shared between callers and must not be modified.
+    """
+    return _cached_yearly_alert_count_df(get_last_update_time())
+
+
+def get_year_dropdown_options() -> List[Dict[str, str]]:
+    """Get the year dropdown options from the months of the data.
+
+    Only the month keys are fetched, which lists the same fiscal years as
+      the yearly alert counts without loading and aggregating the table.
+    """
+    fiscal_years = np.unique(to_fiscal_years(fetch_months("hours_of_operation"))).tolist()
+    return [{"label": year, "value": year} for year in fiscal_years + ["last_12_months", "total"]]
+
+
 layout = dbc.Container(
     [
         dbc.Row(
@@ -81,12 +140,7 @@ layout = dbc.Container(
                     [
                         dcc.Dropdown(
                             id="year-dropdown",
-                            options=[
-                                {"label": year, "value": year}
-                                for year in generate_yearly_alert_count_df(
-                                    fetch_data(["hours_of_operation"], True)["hours_of_operation"]
-                                ).index
-                            ],
+                            options=get_year_dropdown_options(),
                             value=["last_12_months", "total"],
                             multi=True,
                         ),
@@ -104,6 +158,69 @@ layout = dbc.Container(
 )
 
 
+def _yearly_alert_counts_pie(labels: pd.Index, values: np.ndarray, year: str, x_start: float, x_end: float) -> go.Pie:
+    """Create the pie chart of one year's alert counts by operating hours."""
+    return go.Pie(
+        labels=labels,
+        values=values,
+        name=year,
+        textinfo="percent+value",
+        marker=dict(line=dict(color="white", width=2)),
+        textposition="inside",
+        insidetextorientation="tangential",
+        textfont=dict(size=15),
+        domain=dict(x=[x_start, x_end], y=[0, 1]),  # Set the domain for this pie chart
+    )
+
+
+def _yearly_alert_counts_annotation(year: str, x_start: float, x_end: float) -> Dict:
+    """Create the label shown under one year's pie chart."""
+    return dict(
+        x=(x_start + x_end) / 2,
+        y=-0.1,
+        text=year,
+        xanchor="center",
+        showarrow=False,
+        font=dict(size=16),
+    )
+
+
+def _patch_selected_years(current_fig: Dict, selected_years: List[str]) -> Optional[dash.Patch]:
+    """Patch the pies of the current figure to match a new year selection.
+
+    Only the pies of newly selected years are sent to the browser, the
+      pies that stay selected are just resized.
+
+    Returns:
+        A Patch of the current figure, or None if it can't be patched to
+          the selection and needs to be rebuilt.
+    """
+    shown_years = [trace["name"] for trace in current_fig["data"]]
+    kept_years = [year for year in shown_years if year in selected_years]
+    added_years = [year for year in selected_years if year not in shown_years]
+    if not shown_years or kept_years + added_years != selected_years:
+        return None
+
+    df = get_yearly_alert_count_df().rename(columns=_QUANTITY_COLUMN_LABELS)
+    width_per_pie = 1.0 / len(selected_years)
+    patched_fig = dash.Patch()
+    for i in reversed(range(len(shown_years))):
+        if shown_years[i] not in selected_years:
+            del patched_fig["data"][i]
+    for i in range(len(kept_years)):
+        patched_fig["data"][i]["domain"]["x"] = [i * width_per_pie, (i + 1) * width_per_pie]
+    for i, year in enumerate(added_years, start=len(kept_years)):
+        pie = _yearly_alert_counts_pie(
+            df.columns, df.loc[year, :].to_numpy(), year, i * width_per_pie, (i + 1) * width_per_pie
+        )
+        patched_fig["data"].append(pie.to_plotly_json())
+    patched_fig["layout"]["annotations"] = [
+        _yearly_alert_counts_annotation(year, i * width_per_pie, (i + 1) * width_per_pie)
+        for i, year in enumerate(selected_years)
+    ]
+    return patched_fig
+
+
 @callback(
     Output("yearly-alert-counts-by-operating-hours", "figure"),
     [Input("yearly-alert-counts-by-operating-hours", "relayoutData"), Input("theme-template-store", "data")],
@@ -112,14 +229,15 @@ layout = dbc.Container(
 )
 def update_yearly_alert_counts_by_operating_hours(
     relayoutData: Dict, template_data: Dict[str, Dict], selected_years: List[str], current_fig: Dict
-) -> Union[go.Figure, Dict]:
+) -> Union[go.Figure, Dict, dash.Patch]:
     """Update or create chart of yearly alert counts by operating hours.
 
     Refresh the pie chart based on the user's year selection from the
       dropdown or the chosen legends. Update the layout and annotations
       of the chart accordingly. If no years are selected or if there's
       an attempt to update without necessary parameters, prevent the
-      update to avoid errors.
+      update to avoid errors. Dropdown changes patch the existing chart
+      instead of rebuilding it when possible.
 
     Args:
         selected_years: Years chosen by the user to display.
@@ -132,50 +250,35 @@ def update_yearly_alert_counts_by_operating_hours(
         else:
             return current_fig  # Redraw the plot with disabled legends
 
+    if current_fig and selected_years and dash.ctx.triggered_id == "year-dropdown":
+        patched_fig = _patch_selected_years(current_fig, selected_years)
+        if patched_fig is not None:
+            return patched_fig
+
     # If the plot doesn't exist, create one
     if (not current_fig and relayoutData) or selected_years:
-        df = generate_yearly_alert_count_df(fetch_data(["hours_of_operation"], True)["hours_of_operation"])
-        df = df.rename(
-            columns={
-                "bh_day_quantities": "Business Hours",
-                "nights_quantities": "Nights",
-                "weekend_quantities": "Weekend",
-            }
-        )
+        df = get_yearly_alert_count_df().rename(columns=_QUANTITY_COLUMN_LABELS)
 
-        fig = go.Figure()
-        if selected_years:
-            width_per_pie = 1.0 / len(selected_years)
-        else:
-            return fig
+        if not selected_years:
+            return go.Figure()
 
-        for i, year in enumerate(selected_years):
-            values = df.loc[year, :]
-            x_start = i * width_per_pie
-            x_end = x_start + width_per_pie
-            fig.add_trace(
-                go.Pie(
-                    labels=values.index,
-                    values=values,
-                    name=year,
-                    textinfo="percent+value",
-                    marker=dict(line=dict(color="white", width=2)),
-                    textposition="inside",
-                    insidetextorientation="tangential",
-                    textfont=dict(size=15),
-                    domain=dict(x=[x_start, x_end], y=[0, 1]),  # Set the domain for this pie chart
-                )
-            )
-            fig.add_annotation(
-                x=(x_start + x_end) / 2,
-                y=-0.1,
-                text=year,
-                xanchor="center",
-                showarrow=False,
-                font=dict(size=16),
-            )
+        n = len(selected_years)
+        width_per_pie = 1.0 / n
+        values = df.loc[selected_years, :].to_numpy()
+        bounds = [(i * width_per_pie, (i + 1) * width_per_pie) for i in range(n)]
 
+        # zero spacing keeps the pie domains the same as the patched ones
+        fig = make_subplots(rows=1, cols=n, specs=[[{"type": "domain"}] * n], horizontal_spacing=0)
+        fig.add_traces(
+            [
+                _yearly_alert_counts_pie(df.columns, values[i], year, *bounds[i])
+                for i, year in enumerate(selected_years)
+            ],
+            rows=1,
+            cols=list(range(1, n + 1)),
+        )
         fig.update_layout(
+            annotations=[_yearly_alert_counts_annotation(year, *bounds[i]) for i, year in enumerate(selected_years)],
             title="Yearly Alert Counts by Operating Hours",
             margin=dict(t=43, l=0, r=0),
             legend=dict(
@@ -208,39 +311,20 @@ def update_yearly_hours_of_operation(
       last 12 months and total averages by default.
     """
     if not current_fig and relayoutData:
-        df = fetch_data(["hours_of_operation"], True)["hours_of_operation"].set_index("month")
+        df = get_hours_of_operation_df().set_index("month")
         df = df[["bh_day_cycle_time_averages", "nights_cycle_time_averages", "weekend_cycle_time_averages"]]
         total = df.mean()
         total.name = "total"
         last_12_months = df.tail(12).mean()
         last_12_months.name = "last_12_months"
 
-        df = df.assign(fiscal_year=df.index.astype(str).to_series().apply(to_fiscal_year))
-        df = df.groupby("fiscal_year").mean()
-
-        df = df.append([last_12_months, total]).round(1)
-        df.rename(
-            columns={
-                "bh_day_cycle_time_averages": "Business Hours",
-                "nights_cycle_time_averages": "Nights",
-                "weekend_cycle_time_averages": "Weekend",
-            },
-            inplace=True,
-        )
-        df.index.name = "index"
-        df = df.T
-
-        sorted_df = pd.DataFrame()
-        for year_time in df.columns:
-            temp_df = df.sort_values(by=year_time, ascending=False).reset_index()
-            temp_df["rank"] = temp_df.index.map(lambda x: f"{to_ordinal(x+1)}")
-            temp_df = temp_df.rename(columns={"index": f"averages_{year_time}"})
-            temp_df = temp_df[["rank", f"averages_{year_time}", year_time]]
+        df = df.assign(fiscal_year=pd.Categorical(to_fiscal_years(df.index)))
+        df = df.groupby("fiscal_year", observed=True).mean()
 
-            if sorted_df.empty:
-                sorted_df = temp_df
-            else:
-                sorted_df = pd.merge(sorted_df, temp_df, on="rank", how="outer")
+        df = pd.concat([df, pd.DataFrame([last_12_months, total])]).round(1)
+        df.rename(columns=_CYCLE_TIME_AVERAGE_COLUMN_LABELS, inplace=True)
+        df = df.T
+        sorted_df = rank_columns(df, "averages")
 
         # Create the figure
         fig = go.Figure()
@@ -286,16 +370,17 @@ def update_hours_of_operation(
       exists, double-clicking on it will reset the range of y-axis.
     """
     if not current_fig and relayoutData:
-        df = fetch_data(["hours_of_operation"], True)["hours_of_operation"].set_index("month")
-        df = df[["bh_day_cycle_time_averages", "nights_cycle_time_averages", "weekend_cycle_time_averages"]]
+        df = get_hours_of_operation_df().set_index("month")
+        df = df[list(_CYCLE_TIME_AVERAGE_COLUMN_LABELS)].rename(columns=_CYCLE_TIME_AVERAGE_COLUMN_LABELS)
+        n = len(df)
         fig = px.line(
             df,
             x=df.index,
             y=df.columns.tolist(),
             labels={"value": ""},
             title="Monthly Hours of Operation",
-            range_x=[len(df.index) - 25, len(df.index) - 1],
-            range_y=[0, df.tail(25).max().max()],
+            range_x=[n - 25, n - 1],
+            range_y=[0, float(np.nanmax(df.to_numpy()[-25:]))],
         )
 
         fig.update_layout(
@@ -305,12 +390,6 @@ def update_hours_of_operation(
             template=template_data["template"],
         )
         for trace in fig.data:
-            if trace.name == "bh_day_cycle_time_averages":
-                trace.name = "Business Hours"
-            elif trace.name == "nights_cycle_time_averages":
-                trace.name = "Nights"
-            else:
-                trace.name = "Weekend"
             trace.mode = "lines+markers"
             trace.marker = dict(size=5, color=trace.line.color)
 
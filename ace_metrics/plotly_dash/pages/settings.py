@@ -1,19 +1,12 @@
 """Settings page for Dash app."""
 
-from typing import Dict, List, Union
-
 import dash
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from dash import Input, Output, State, callback, dcc, html, callback_context
-from plotly.subplots import make_subplots
+from dash import Input, Output, callback, dcc, html, callback_context
 from datetime import date, datetime
 
 from flask import session
 
-from ace_metrics.plotly_dash.app import chart_config
 from ace_metrics.plotly_dash.helpers import fetch_data, VALID_TABLE_NAMES_MAP
 from ace_metrics.helpers import dataframes_to_xlsx_bytes
 from ace_metrics.plotly_dash.database import DASH_CONFIG
@@ -83,16 +76,18 @@ def download_data(n_clicks, start_date, end_date):
     trigger_id = ctx.triggered[0]["prop_id"].split(".")[0]
     # Check if the callback was triggered by the button click
     if trigger_id == "btn-download" and start_date and end_date and start_date < end_date:
-        start_date = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y%m")
-        end_date = datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y%m")
-        df_map = fetch_data(VALID_TABLE_NAMES_MAP.keys(), True)
+        start_month = int(datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y%m"))
+        end_month = int(datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y%m"))
+        df_map = fetch_data(VALID_TABLE_NAMES_MAP.keys(), True, index_col="month")
+        tables = []
         for table_name, df in df_map.items():
-            df.set_index("month", inplace=True)
             if table_name == "alert_count":
-                df["delivery_combined"] = df["weaponization"] + df["delivery"] + df["reconnaissance"]
-            df_map[table_name] = df[(df.index >= start_date) & (df.index <= end_date)]
-            df_map[table_name].name = df.name
-        filebytes = dataframes_to_xlsx_bytes(df_map.values())
+                df["delivery_combined"] = df[["weaponization", "delivery", "reconnaissance"]].sum(axis=1)
+            months = df.index.astype("int64")
+            table = df[(months >= start_month) & (months <= end_month)]
+            table.name = df.name
+            tables.append(table)
+        filebytes = dataframes_to_xlsx_bytes(tables)
         return dcc.send_bytes(filebytes, f"ACE_Metrics_{int(datetime.timestamp(datetime.now()))}.xlsx")
     else:
         # Callback was not triggered by the button click, do nothing